@@ -0,0 +1,169 @@
+# covid_ct/io/_series_cache.py
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+import SimpleITK as sitk
+
+try:
+    from pydicom import dcmread
+    PYDICOM = True
+except Exception:
+    PYDICOM = False
+
+# orjson is several times faster on the large per-folder file lists; same JSON either way
+try:
+    import orjson
+    _loads, _dumps = orjson.loads, orjson.dumps
+except Exception:
+    _loads, _dumps = json.loads, lambda obj: json.dumps(obj).encode("utf-8")
+
+# Where series indexes are kept (one small JSON per DICOM folder)
+CACHE_DIR = Path(os.environ.get("COVID_CT_CACHE", Path.home() / ".cache" / "covid_ct"))
+
+# How many files' mtimes go into the folder signature
+_SIGNATURE_FILES = 32
+
+# Tags needed to group files into series and order the slices
+_GROUP_TAGS = [
+    "SeriesInstanceUID", "Modality", "SeriesDescription",
+    "ImagePositionPatient", "ImageOrientationPatient", "InstanceNumber",
+]
+
+
+def _dir_signature(dicom_dir: str) -> list:
+    """
+    Cheap "did anything change?" key for a folder:
+    [folder mtime_ns, file count, sha1 hex of the mtime_ns of the first N files].
+    (A digest rather than a sum, so every entry fits in a 64-bit JSON integer.)
+    """
+    names = sorted(os.listdir(dicom_dir))
+    h = hashlib.sha1()
+    for n in names[:_SIGNATURE_FILES]:
+        h.update(os.stat(os.path.join(dicom_dir, n)).st_mtime_ns.to_bytes(8, "little", signed=True))
+    return [os.stat(dicom_dir).st_mtime_ns, len(names), h.hexdigest()]
+
+
+def _is_dicom(path: str) -> bool:
+    """True if the file has the DICOM preamble ("DICM" at byte 128)."""
+    try:
+        with open(path, "rb") as f:
+            return f.read(132)[128:] == b"DICM"
+    except OSError:
+        return False
+
+
+def _enumerate_dicom_files(dicom_dir: str) -> List[str]:
+    """
+    DICOM files directly inside dicom_dir (same depth GDCM scans).
+    Hidden entries (.DS_Store, ._foo, ...) and non-DICOM files are skipped.
+    """
+    out = []
+    with os.scandir(dicom_dir) as it:
+        for e in it:
+            if e.name.startswith(".") or not e.is_file():
+                continue
+            if _is_dicom(e.path):
+                out.append(e.path)
+    return sorted(out)
+
+
+def _read_group_tags(path: str):
+    ds = dcmread(path, stop_before_pixels=True, specific_tags=_GROUP_TAGS)
+    ipp = getattr(ds, "ImagePositionPatient", None)
+    iop = getattr(ds, "ImageOrientationPatient", None)
+    if ipp is not None and iop is not None and len(ipp) == 3 and len(iop) == 6:
+        # distance along the slice normal, like GDCM's IPP sorter
+        r, c = [float(v) for v in iop[:3]], [float(v) for v in iop[3:]]
+        n = (r[1]*c[2] - r[2]*c[1], r[2]*c[0] - r[0]*c[2], r[0]*c[1] - r[1]*c[0])
+        pos = sum(float(p) * k for p, k in zip(ipp, n))
+    else:
+        pos = float(getattr(ds, "InstanceNumber", 0) or 0)
+    return (
+        str(getattr(ds, "SeriesInstanceUID", "")),
+        str(getattr(ds, "Modality", "")).upper(),
+        str(getattr(ds, "SeriesDescription", "")).upper(),
+        pos,
+        path,
+    )
+
+
+def _scan_pydicom(dicom_dir: str) -> Dict[str, dict]:
+    """
+    Group the folder's DICOM files by SeriesInstanceUID using header-only
+    pydicom reads; slices are ordered along the slice normal.
+    """
+    files = _enumerate_dicom_files(dicom_dir)
+    if not files:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(16, len(files))) as ex:
+        rows = list(ex.map(_read_group_tags, files))
+
+    series = {}
+    for uid, modality, desc, pos, path in sorted(rows, key=lambda r: (r[0], r[3], r[4])):
+        entry = series.setdefault(uid, {"files": [], "modality": modality, "desc": desc})
+        entry["files"].append(path)
+    return series
+
+
+def _scan_gdcm(dicom_dir: str) -> Dict[str, dict]:
+    """
+    Full GDCM enumeration + first-file metadata for every series in dicom_dir.
+    """
+    from covid_ct.io.dicom import _read_meta
+
+    series_ids = sitk.ImageSeriesReader().GetGDCMSeriesIDs(dicom_dir) or []
+
+    def _one(sid):
+        # own reader per call: SimpleITK readers are not safe to share across threads
+        files = list(sitk.ImageSeriesReader().GetGDCMSeriesFileNames(dicom_dir, sid))
+        modality, desc = _read_meta(files[0]) if files else ("", "")
+        return sid, {"files": files, "modality": modality, "desc": desc}
+
+    if not series_ids:
+        return {}
+    # header reads are I/O bound -> overlap them across series
+    with ThreadPoolExecutor(max_workers=min(16, len(series_ids))) as ex:
+        return dict(ex.map(_one, series_ids))
+
+
+def _scan(dicom_dir: str) -> Dict[str, dict]:
+    return _scan_pydicom(dicom_dir) if PYDICOM else _scan_gdcm(dicom_dir)
+
+
+def _cache_file(dicom_dir: str) -> Path:
+    return CACHE_DIR / (hashlib.sha1(dicom_dir.encode("utf-8")).hexdigest() + ".json")
+
+
+def get_series_index(dicom_dir: str) -> Dict[str, dict]:
+    """
+    Return {series_uid: {"files": [...], "modality": "CT", "desc": "..."}} for dicom_dir.
+
+    The index is stored on disk and reused as long as the folder signature
+    (mtime + file count) is unchanged, so GDCM only rescans folders that changed.
+    """
+    dicom_dir = os.path.abspath(str(dicom_dir))
+    signature = _dir_signature(dicom_dir)
+    cache_file = _cache_file(dicom_dir)
+
+    try:
+        cached = _loads(cache_file.read_bytes())
+        if cached["dir"] == dicom_dir and cached["signature"] == signature:
+            return cached["series"]
+    except (OSError, ValueError, KeyError):
+        pass  # missing / unreadable / old format -> rescan
+
+    series = _scan(dicom_dir)
+
+    # best effort: a read-only home dir just means no caching
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(_dumps({"dir": dicom_dir, "signature": signature, "series": series}))
+        os.replace(tmp, cache_file)
+    except OSError:
+        pass
+    return series
@@ -1,29 +1,49 @@
 # covid_ct/io/dicom.py
-from pathlib import Path
+import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional, Tuple
+import numpy as np
 import SimpleITK as sitk
 
+from covid_ct.io._series_cache import get_series_index
+from covid_ct.io.series_select import best_series_in_dir
+
+try:
+    from pydicom import dcmread
+    PYDICOM = True
+except Exception:
+    PYDICOM = False
+
+try:
+    import nibabel as nib
+    NIBABEL = True
+except Exception:
+    NIBABEL = False
+
 # DICOM tags we’ll peek at for filtering
 TAG_MODALITY = "0008|0060"       # e.g., CT/MR
 TAG_SERIES_DESC = "0008|103e"    # SeriesDescription
 
+# threads decoding slices in read_dicom_series (lower it for slow network shares)
+READ_WORKERS = int(os.environ.get("COVID_CT_READ_WORKERS", 8))
+
 
 def list_series(dicom_dir: str) -> List[str]:
     """
     Return a list of SeriesInstanceUIDs found under dicom_dir.
     """
-    dicom_dir = Path(dicom_dir)
-    reader = sitk.ImageSeriesReader()
-    series_ids = reader.GetGDCMSeriesIDs(str(dicom_dir))
-    return series_ids or []
+    return list(get_series_index(dicom_dir))
 
 
 def files_for_series(dicom_dir: str, series_uid: str) -> List[str]:
     """
     Return the sorted file list for a specific series UID in dicom_dir.
     """
+    entry = get_series_index(dicom_dir).get(series_uid)
+    if entry is not None:
+        return entry["files"]
     reader = sitk.ImageSeriesReader()
-    return reader.GetGDCMSeriesFileNames(dicom_dir, series_uid)
+    return reader.GetGDCMSeriesFileNames(str(dicom_dir), series_uid)
 
 
 def _read_meta(first_file: str) -> Tuple[str, str]:
@@ -31,6 +51,13 @@ def _read_meta(first_file: str) -> Tuple[str, str]:
     Read minimal metadata from a single DICOM file.
     Returns (modality_upper, series_description_upper).
     """
+    if PYDICOM:
+        # header only, and stop after the two tags we need
+        ds = dcmread(first_file, stop_before_pixels=True,
+                     specific_tags=["Modality", "SeriesDescription"])
+        return (str(getattr(ds, "Modality", "")).upper(),
+                str(getattr(ds, "SeriesDescription", "")).upper())
+
     r = sitk.ImageFileReader()
     r.SetFileName(first_file)
     r.ReadImageInformation()
@@ -47,32 +74,7 @@ def pick_best_ct_series(dicom_dir: str) -> Optional[List[str]]:
       - Prefer the series with more files (full volumetric scan)
     Returns the file list for the chosen series, or None.
     """
-    dicom_dir = Path(dicom_dir)
-    reader = sitk.ImageSeriesReader()
-    series_ids = reader.GetGDCMSeriesIDs(str(dicom_dir)) or []
-    if not series_ids:
-        return None
-
-    candidates = []
-    for sid in series_ids:
-        files = reader.GetGDCMSeriesFileNames(str(dicom_dir), sid)
-        if not files:
-            continue
-        modality, desc = _read_meta(files[0])
-        is_ct = (modality == "CT")
-        is_scout = ("SCOUT" in desc) or ("LOCALIZER" in desc) or ("TOP" in desc)
-        # score by slice count; penalize scout heavily
-        score = len(files) - (10000 if is_scout else 0)
-        candidates.append((score, is_ct, not is_scout, files))
-
-    if not candidates:
-        return None
-
-    # Prefer CT-only pool; else use all
-    pool = [c for c in candidates if c[1]] or candidates
-    # Highest score wins
-    pool.sort(key=lambda x: x[0], reverse=True)
-    return pool[0][3]
+    return best_series_in_dir(dicom_dir)
 
 
 def read_dicom_series(dicom_dir: str, series_uid: str = None) -> sitk.Image:
@@ -91,9 +93,58 @@ def read_dicom_series(dicom_dir: str, series_uid: str = None) -> sitk.Image:
         if not files:
             raise RuntimeError(f"No readable DICOM series found in {dicom_dir}")
 
-    reader = sitk.ImageSeriesReader()
-    reader.SetFileNames(files)
-    img = reader.Execute()
+    img = _read_slices_parallel(files)
+    if img is None:
+        reader = sitk.ImageSeriesReader()
+        reader.SetFileNames(files)
+        img = reader.Execute()
+    return img
+
+
+def _read_slices_parallel(files: List[str]) -> Optional[sitk.Image]:
+    """
+    Decode the (already slice-ordered) files on a thread pool into one preallocated
+    array, with the geometry ImageSeriesReader would give: origin/direction of the
+    first slice, z spacing from the first-to-last position.
+    Returns None (caller falls back to ImageSeriesReader) if the slices don't stack.
+    """
+    if len(files) < 2 or READ_WORKERS < 2:
+        return None
+    first = sitk.ReadImage(files[0])
+    if first.GetNumberOfComponentsPerPixel() != 1:
+        return None
+    first_arr = sitk.GetArrayFromImage(first).reshape(-1, *first.GetSize()[1::-1])
+    if first_arr.shape[0] != 1:
+        return None  # multi-frame file
+    vol = np.empty((len(files),) + first_arr.shape[1:], dtype=first_arr.dtype)
+    vol[0] = first_arr[0]
+    origins = [None] * len(files)
+
+    def read_one(i):
+        sl = sitk.ReadImage(files[i])
+        a = sitk.GetArrayViewFromImage(sl)
+        if a.size != vol[i].size or a.dtype != vol.dtype:
+            return False
+        vol[i] = a.reshape(vol.shape[1:])
+        origins[i] = sl.GetOrigin()
+        return True
+
+    with ThreadPoolExecutor(max_workers=min(READ_WORKERS, len(files) - 1)) as ex:
+        if not all(ex.map(read_one, range(1, len(files)))):
+            return None
+
+    direction = np.array(first.GetDirection()).reshape(first.GetDimension(), -1)
+    if direction.shape != (3, 3):
+        return None
+    normal = direction[:, 2]
+    dz = float(np.dot(np.subtract(origins[-1], first.GetOrigin()), normal)) / (len(files) - 1)
+    if dz <= 0:
+        return None  # not ordered along the slice normal; let ITK sort it out
+
+    img = sitk.GetImageFromArray(vol)
+    img.SetOrigin(first.GetOrigin())
+    img.SetSpacing((*first.GetSpacing()[:2], dz))
+    img.SetDirection(first.GetDirection())
     return img
 
 
@@ -104,17 +155,39 @@ def write_nifti(img: sitk.Image, out_path: str) -> None:
     sitk.WriteImage(img, str(out_path))
 
 
+def write_nifti_fast(img: sitk.Image, out_path: str) -> None:
+    """
+    Same output as write_nifti, written with nibabel when it is installed
+    (its NIfTI codec is much faster than SimpleITK's). Falls back to write_nifti
+    for non-scalar / non-3D images or when nibabel is missing.
+    """
+    if not NIBABEL or img.GetDimension() != 3 or img.GetNumberOfComponentsPerPixel() != 1:
+        write_nifti(img, out_path)
+        return
+
+    # voxel (i,j,k) -> physical: origin + direction @ diag(spacing) @ ijk, in LPS
+    affine = np.eye(4)
+    affine[:3, :3] = np.array(img.GetDirection()).reshape(3, 3) * np.array(img.GetSpacing())
+    affine[:3, 3] = img.GetOrigin()
+    affine[:2] *= -1  # LPS (ITK) -> RAS (NIfTI)
+
+    # view of the sitk buffer, [z,y,x] -> [x,y,z]; img stays alive until written
+    arr = sitk.GetArrayViewFromImage(img).transpose(2, 1, 0)
+    nii = nib.Nifti1Image(arr, affine)
+    nii.set_qform(affine, code=1)
+    nii.set_sform(affine, code=1)
+    nii.header.set_xyzt_units("mm")
+    nii.to_filename(str(out_path))
+
+
 # ----- Optional convenience: quick probe -----
 def probe_series(dicom_dir: str) -> List[Tuple[str, str, int]]:
     """
     Return [(series_uid, 'CT|MR ... / description', num_files), ...] for quick debugging.
     """
     out = []
-    reader = sitk.ImageSeriesReader()
-    for sid in list_series(dicom_dir):
-        files = reader.GetGDCMSeriesFileNames(dicom_dir, sid)
-        if not files:
+    for sid, entry in get_series_index(dicom_dir).items():
+        if not entry["files"]:
             continue
-        modality, desc = _read_meta(files[0])
-        out.append((sid, f"{modality} / {desc}", len(files)))
+        out.append((sid, f"{entry['modality']} / {entry['desc']}", len(entry["files"])))
     return out
@@ -1,39 +1,42 @@
 # covid_ct/io/series_select.py
+import functools
+import os
 from pathlib import Path
-import SimpleITK as sitk
 
-TAG_MODALITY = "0008|0060"       # CT/MR
-TAG_SERIES_DESC = "0008|103e"    # SeriesDescription
+from covid_ct.io._series_cache import get_series_index
 
-def _read_meta(first_file):
-    r = sitk.ImageFileReader()
-    r.SetFileName(first_file)
-    r.ReadImageInformation()
-    modality = r.GetMetaData(TAG_MODALITY) if r.HasMetaDataKey(TAG_MODALITY) else ""
-    desc = r.GetMetaData(TAG_SERIES_DESC) if r.HasMetaDataKey(TAG_SERIES_DESC) else ""
-    return modality.upper(), desc.upper()
+def _score_series(entry):
+    files = entry["files"]
+    if not files:
+        return None
+    modality, desc = entry["modality"], entry["desc"]
+    is_ct = modality == "CT"
+    is_scout = any(k in desc for k in ["SCOUT", "LOCALIZER", "TOP"])
+    score = len(files) - (10000 if is_scout else 0)
+    return (score, is_ct, not is_scout, files)
 
-def best_series_in_dir(dicom_dir):
-    dicom_dir = Path(dicom_dir)
-    reader = sitk.ImageSeriesReader()
-    series_ids = reader.GetGDCMSeriesIDs(str(dicom_dir)) or []
-    if not series_ids:
+@functools.lru_cache(maxsize=256)
+def _best_series_cached(dicom_dir, mtime_ns):
+    # mtime_ns is only part of the cache key (a changed folder gets rescanned)
+    index = get_series_index(dicom_dir)
+    if not index:
         return None
 
-    candidates = []
-    for sid in series_ids:
-        files = reader.GetGDCMSeriesFileNames(str(dicom_dir), sid)
-        if not files:
-            continue
-        modality, desc = _read_meta(files[0])
-        is_ct = modality == "CT"
-        is_scout = any(k in desc for k in ["SCOUT", "LOCALIZER", "TOP"])
-        score = len(files) - (10000 if is_scout else 0)
-        candidates.append((score, is_ct, not is_scout, files))
+    candidates = [c for c in map(_score_series, index.values()) if c]
 
     if not candidates:
         return None
 
     pool = [c for c in candidates if c[1]] or candidates
     pool.sort(key=lambda x: x[0], reverse=True)
-    return pool[0][3]
+    return tuple(pool[0][3])
+
+def best_series_in_dir(dicom_dir):
+    """
+    Pick the 'best' CT series in a folder (CT first, scouts down-ranked,
+    most slices wins). Returns its file list, or None.
+    Memoized per folder + mtime for the lifetime of the process.
+    """
+    dicom_dir = str(Path(dicom_dir).resolve())
+    files = _best_series_cached(dicom_dir, os.stat(dicom_dir).st_mtime_ns)
+    return list(files) if files else None
@@ -1,60 +1,82 @@
 # covid_ct/metrics/seg_metrics.py (No Idea how but taking a swing baseed on the class notes and google searches)
+import numpy as np
 import SimpleITK as sitk
+from scipy.spatial import cKDTree
 
 def _binarize(a):
+    if a.GetPixelID() == sitk.sitkUInt8:
+        # assume already 0/1 -- what our segmentation steps write out
+        return a
     return sitk.Cast(a > 0, sitk.sitkUInt8)
 
+def _as_bool(mask):
+    # same test as _binarize (> 0), done on a view of the caller's buffer
+    return sitk.GetArrayViewFromImage(mask) > 0
+
+# set bits per byte, for NumPy builds without np.bitwise_count (< 2.0)
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def _popcount(bits):
+    if hasattr(np, "bitwise_count"):
+        return int(np.bitwise_count(bits).sum(dtype=np.int64))
+    return int(_POPCOUNT8[bits].sum(dtype=np.int64))
+
+def overlap_stats(a_mask, b_mask):
+    """
+    All overlap metrics from one confusion count (a = reference, b = prediction).
+    Masks are packed to 1 bit/voxel so the counts run over 1/8 of the bytes.
+    Returns dict with tp/fp/fn voxel counts and dice, jaccard, precision, recall.
+    """
+    a_bits = np.packbits(_as_bool(a_mask).ravel())
+    b_bits = np.packbits(_as_bool(b_mask).ravel())
+    tp = _popcount(a_bits & b_bits)
+    a_sum = _popcount(a_bits)
+    b_sum = _popcount(b_bits)
+    fp = b_sum - tp  # predicted=1, gt=0
+    fn = a_sum - tp  # gt=1, pred=0
+    return {
+        "tp": int(tp), "fp": int(fp), "fn": int(fn),
+        "dice": 2.0 * tp / (a_sum + b_sum) if (a_sum + b_sum) else 0.0,
+        "jaccard": tp / (a_sum + b_sum - tp) if (a_sum + b_sum - tp) else 0.0,
+        "precision": tp / (tp + fp + 1e-8),
+        "recall": tp / (tp + fn + 1e-8),
+    }
+
 def dice(a_mask, b_mask):
-    a = _binarize(a_mask); b = _binarize(b_mask)
-    f = sitk.LabelOverlapMeasuresImageFilter()
-    f.Execute(a, b)
-    return f.GetDiceCoefficient()
+    return overlap_stats(a_mask, b_mask)["dice"]
 
 def jaccard(a_mask, b_mask):#(WHY YOU KEE FAILING ME (Oh it works now, was a typo))
-    a = _binarize(a_mask); b = _binarize(b_mask)
-    f = sitk.LabelOverlapMeasuresImageFilter()
-    f.Execute(a, b)
-    return f.GetJaccardCoefficient()
+    return overlap_stats(a_mask, b_mask)["jaccard"]
 
 def precision(a_mask, b_mask):
-    a = _binarize(a_mask); b = _binarize(b_mask)
-    tp = sitk.And(a, b)
-    fp = sitk.And(sitk.InvertIntensity(a, 1), b)  # predicted=1, gt=0
-    tp_sum = sitk.GetArrayFromImage(tp).sum()
-    fp_sum = sitk.GetArrayFromImage(fp).sum()
-    return tp_sum / (tp_sum + fp_sum + 1e-8)
+    return overlap_stats(a_mask, b_mask)["precision"]
 
 def recall(a_mask, b_mask):
-    a = _binarize(a_mask); b = _binarize(b_mask)
-    tp = sitk.And(a, b)
-    fn = sitk.And(a, sitk.InvertIntensity(b, 1))  # gt=1, pred=0
-    tp_sum = sitk.GetArrayFromImage(tp).sum()
-    fn_sum = sitk.GetArrayFromImage(fn).sum()
-    return tp_sum / (tp_sum + fn_sum + 1e-8)
+    return overlap_stats(a_mask, b_mask)["recall"]
 
 def hausdorff95(a_mask, b_mask, spacing=None):# (The math isn't mathing here. oh wait no nevermind I was just being dumb, needed to add useImageSpacing=True)
     """
     95th percentile symmetric Hausdorff distance (mm).
+    Surface-to-surface nearest neighbours via KD-trees, so only contour voxels are touched.
     """
     a = _binarize(a_mask); b = _binarize(b_mask)
     if spacing is None:
         spacing = a_mask.GetSpacing()
-
-    # distance maps
-    a_dt = sitk.SignedMaurerDistanceMap(a, squaredDistance=False, useImageSpacing=True)
-    b_dt = sitk.SignedMaurerDistanceMap(b, squaredDistance=False, useImageSpacing=True)
+    zyx_spacing = np.asarray(spacing, dtype=np.float64)[::-1]
 
     a_surf = sitk.LabelContour(a)
     b_surf = sitk.LabelContour(b)
 
-    # distances from each surface to the other mask
-    a2b = sitk.Abs(a_dt) * sitk.Cast(b_surf>0, sitk.sitkFloat32)
-    b2a = sitk.Abs(b_dt) * sitk.Cast(a_surf>0, sitk.sitkFloat32)
-
-    import numpy as np
-    a_vals = sitk.GetArrayFromImage(a2b)
-    b_vals = sitk.GetArrayFromImage(b2a)
-    vals = np.concatenate([a_vals[a_vals>0], b_vals[b_vals>0]])
-    if vals.size == 0:
+    # surface voxel positions in mm (array order z,y,x)
+    a_pts = np.argwhere(sitk.GetArrayViewFromImage(a_surf)) * zyx_spacing
+    b_pts = np.argwhere(sitk.GetArrayViewFromImage(b_surf)) * zyx_spacing
+    if len(a_pts) == 0 and len(b_pts) == 0:
         return 0.0
+    if len(a_pts) == 0 or len(b_pts) == 0:
+        return float("inf")
+
+    # distances from each surface to the other surface
+    a2b = cKDTree(b_pts).query(a_pts)[0]
+    b2a = cKDTree(a_pts).query(b_pts)[0]
+    vals = np.concatenate([a2b, b2a])
     return float(np.percentile(vals, 95.0))
@@ -1,36 +1,146 @@
 # covid_ct/preprocess/resample.py
+import numpy as np
 import SimpleITK as sitk
 
+try:
+    from numba import njit, prange
+    NUMBA = True
+except Exception:
+    NUMBA = False
+
+try:
+    import cupy as cp
+    from cupyx.scipy.ndimage import affine_transform as _cp_affine_transform
+    CUPY = cp.cuda.runtime.getDeviceCount() > 0
+except Exception:
+    CUPY = False
+
 def clip_and_norm(img, hu_min=-1000, hu_max=400, zscore=True): #(had to look up other people's code on github for this one)
     """
     Clip HU to [hu_min, hu_max], scale to [0,1], optional z-score normalize.
+    Done in place on one float32 NumPy copy instead of chained sitk images.
     """
-    img = sitk.Cast(img, sitk.sitkFloat32)
-    img = sitk.Clamp(img, sitk.sitkFloat32, hu_min, hu_max)
-    img = (img - hu_min) / max(1e-6, (hu_max - hu_min))
+    # clip straight from a view of the input into one float32 buffer
+    # (no sitk.Cast copy, whatever the input pixel type)
+    view = sitk.GetArrayViewFromImage(img)
+    arr = np.empty(view.shape, dtype=np.float32)
+    np.clip(view, hu_min, hu_max, out=arr)
+    arr -= hu_min
+    arr *= 1.0 / max(1e-6, (hu_max - hu_min))
     if zscore:
-        stats = sitk.StatisticsImageFilter()
-        stats.Execute(img)
-        mean = stats.GetMean()
-        std = stats.GetSigma() or 1.0
-        img = (img - mean) / std
-    return img
+        mean = arr.mean(dtype=np.float64)
+        std = arr.std(dtype=np.float64, ddof=1) or 1.0  # sample sigma, as StatisticsImageFilter
+        arr -= mean
+        arr /= std
+    out = sitk.GetImageFromArray(arr)
+    out.CopyInformation(img)
+    return out
 
-def resample_isotropic(img, spacing=(1.25, 1.25, 1.25), interp=sitk.sitkLinear): 
+if NUMBA:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _clip_scale(arr, mn, mx, sums, sqsums):
+        # clip + scale to [0,1] in place; per-slice sums feed the z-score
+        scale = 1.0 / max(1e-6, mx - mn)
+        nz, ny, nx = arr.shape
+        for z in prange(nz):
+            s = 0.0
+            sq = 0.0
+            for y in range(ny):
+                for x in range(nx):
+                    v = (min(max(arr[z, y, x], mn), mx) - mn) * scale
+                    arr[z, y, x] = v
+                    s += v
+                    sq += v * v
+            sums[z] = s
+            sqsums[z] = sq
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _apply_zscore(arr, mean, std):
+        inv = 1.0 / std
+        nz, ny, nx = arr.shape
+        for z in prange(nz):
+            for y in range(ny):
+                for x in range(nx):
+                    arr[z, y, x] = (arr[z, y, x] - mean) * inv
+
+def clip_and_norm_fast(img, hu_min=-1000, hu_max=400, zscore=True):
     """
-    Resample to isotropic spacing (mm) with identity transform.
+    Same result as clip_and_norm, but clip/scale/statistics run as one
+    parallel Numba pass. Falls back to clip_and_norm without Numba or for non-3D images.
     """
-    original_spacing = img.GetSpacing()
-    original_size = img.GetSize()
-    new_size = [
+    if not NUMBA or img.GetDimension() != 3:
+        return clip_and_norm(img, hu_min, hu_max, zscore)
+
+    view = sitk.GetArrayViewFromImage(img)
+    arr = np.empty(view.shape, dtype=np.float32)
+    arr[...] = view  # single converting copy
+    sums = np.empty(arr.shape[0], dtype=np.float64)
+    sqsums = np.empty(arr.shape[0], dtype=np.float64)
+    _clip_scale(arr, float(hu_min), float(hu_max), sums, sqsums)
+    if zscore:
+        n = arr.size
+        mean = sums.sum() / n
+        var = (sqsums.sum() - n * mean * mean) / max(1, n - 1)
+        std = float(np.sqrt(max(var, 0.0))) or 1.0
+        _apply_zscore(arr, mean, std)
+    out = sitk.GetImageFromArray(arr)
+    out.CopyInformation(img)
+    return out
+
+def _isotropic_size(img, spacing):
+    return [
         int(round(osz * ospc / nspc))
-        for osz, ospc, nspc in zip(original_size, original_spacing, spacing)
+        for osz, ospc, nspc in zip(img.GetSize(), img.GetSpacing(), spacing)
     ]
-    ref = sitk.Image(new_size, img.GetPixelID())
-    ref.SetSpacing(spacing)
-    ref.SetOrigin(img.GetOrigin())
-    ref.SetDirection(img.GetDirection())
-    return sitk.Resample(img, ref, sitk.Transform(), interp, 0.0, img.GetPixelID())
+
+def resample_isotropic(img, spacing=(1.25, 1.25, 1.25), interp=sitk.sitkLinear): 
+    """
+    Resample to isotropic spacing (mm) with identity transform.
+    """
+    new_size = _isotropic_size(img, spacing)
+    # geometry-only overload: no reference image buffer gets allocated
+    return sitk.Resample(
+        img, new_size, sitk.Transform(), interp,
+        img.GetOrigin(), tuple(spacing), img.GetDirection(),
+        0.0, img.GetPixelID()
+    )
+
+def resample_isotropic_gpu(img, spacing=(1.25, 1.25, 1.25), interp=sitk.sitkLinear):
+    """
+    Same grid and values as resample_isotropic, interpolated on the GPU with CuPy.
+    Origin and direction are kept, so output voxel i samples input index
+    i * new/old spacing on each axis: a diagonal affine_transform.
+    Falls back to resample_isotropic without a CUDA device, for non-scalar /
+    non-3D images, or for interpolators other than linear / nearest neighbour.
+    Integer images are truncated toward zero like ITK's cast, not rounded.
+    """
+    order = {sitk.sitkNearestNeighbor: 0, sitk.sitkLinear: 1}.get(interp)
+    if not CUPY or order is None or img.GetDimension() != 3 \
+            or img.GetNumberOfComponentsPerPixel() != 1:
+        return resample_isotropic(img, spacing, interp)
+
+    new_size = _isotropic_size(img, spacing)
+    view = sitk.GetArrayViewFromImage(img)  # [z,y,x]
+    is_int = np.issubdtype(view.dtype, np.integer)
+    ratio = (np.asarray(spacing, dtype=np.float64) / np.asarray(img.GetSpacing()))[::-1]
+    dst = _cp_affine_transform(
+        # integer input interpolates in double like ITK, so truncation lands on the same value
+        cp.asarray(view, dtype=cp.float64 if is_int else cp.float32), ratio,
+        output_shape=tuple(new_size[::-1]), order=order, mode="nearest"
+    )
+    # ITK treats samples more than half a voxel past the last input voxel as outside (-> 0)
+    for ax, (r, n) in enumerate(zip(ratio, view.shape)):
+        idx = [slice(None)] * 3
+        idx[ax] = slice(int(np.floor((n - 0.5) / r)) + 1, None)
+        dst[tuple(idx)] = 0
+
+    if is_int:
+        dst = cp.trunc(dst)  # sitk.Resample static_casts the interpolated value
+    out = sitk.GetImageFromArray(cp.asnumpy(dst).astype(view.dtype, copy=False))
+    out.SetOrigin(img.GetOrigin())
+    out.SetSpacing(tuple(spacing))
+    out.SetDirection(img.GetDirection())
+    return out
 
 def resample_like(img, reference, interp=sitk.sitkLinear):
     """
@@ -44,3 +154,18 @@ def resample_like(img, reference, interp=sitk.sitkLinear):
         0.0,
         img.GetPixelID()
     )
+
+def preprocess_fused(img_raw, lo=-1000, hi=400, target_spacing=(1.25, 1.25, 1.25), zscore=True):
+    """
+    Clamp -> isotropic resample -> normalize, as the scripts did with
+    sitk.Clamp + resample_isotropic + clip_and_norm, but the clip/scale/z-score
+    runs as one pass (clip_and_norm_fast) and the clamped image is dropped early.
+    img_r is kept as Int16 (HU are integers; half the bytes of float32 for the
+    resample and the HU thresholds); img_n is float32 for the level set.
+    returns: (img_r, img_n) resampled Int16 HU image and its normalized version
+    """
+    img_clip = sitk.Clamp(img_raw, sitk.sitkInt16, lo, hi)
+    img_r = resample_isotropic_gpu(img_clip, tuple(target_spacing))
+    del img_clip
+    img_n = clip_and_norm_fast(img_r, lo, hi, zscore)
+    return img_r, img_n
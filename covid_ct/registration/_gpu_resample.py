@@ -0,0 +1,69 @@
+# covid_ct/registration/_gpu_resample.py
+import numpy as np
+import SimpleITK as sitk
+
+try:
+    import cupy as cp
+    from cupyx.scipy.ndimage import map_coordinates
+    CUPY = cp.cuda.runtime.getDeviceCount() > 0
+except Exception:
+    CUPY = False
+
+# sitk interpolator -> map_coordinates spline order (others stay on the CPU)
+_ORDER = {sitk.sitkNearestNeighbor: 0, sitk.sitkLinear: 1}
+
+# reference slices per displacement-field chunk (bounds host/GPU memory)
+_CHUNK = 16
+
+
+def resample(moving, reference, transform, interp=sitk.sitkLinear, default=0.0):
+    """
+    Same as sitk.Resample(moving, reference, transform, interp, default, moving.GetPixelID()),
+    but interpolates on the GPU when CuPy and a CUDA device are available.
+
+    The transform (rigid, B-spline or composite) is sampled on the reference grid
+    chunk by chunk with sitk.TransformToDisplacementField, so only the
+    interpolation itself moves to the GPU.
+    """
+    if not CUPY or interp not in _ORDER or moving.GetNumberOfComponentsPerPixel() != 1 \
+            or moving.GetDimension() != 3:
+        return sitk.Resample(moving, reference, transform, interp, default, moving.GetPixelID())
+
+    mov_arr = sitk.GetArrayViewFromImage(moving)
+    mov_gpu = cp.asarray(mov_arr, dtype=cp.float32)
+    mov_shape = cp.asarray(mov_arr.shape[::-1], dtype=cp.float64)  # x,y,z
+
+    # physical offset -> continuous moving index (x,y,z)
+    m_dir = np.array(moving.GetDirection()).reshape(3, 3)
+    to_index = cp.asarray(np.linalg.inv(m_dir) / np.array(moving.GetSpacing())[:, None])
+    m_origin = cp.asarray(moving.GetOrigin())
+
+    r_dir = cp.asarray(np.array(reference.GetDirection()).reshape(3, 3))
+    r_spacing = cp.asarray(reference.GetSpacing())
+    nx, ny, nz = reference.GetSize()
+    out = np.empty((nz, ny, nx), dtype=mov_arr.dtype)
+
+    for z0 in range(0, nz, _CHUNK):
+        nzc = min(_CHUNK, nz - z0)
+        origin = reference.TransformIndexToPhysicalPoint((0, 0, z0))
+        disp = sitk.TransformToDisplacementField(
+            transform, sitk.sitkVectorFloat64, (nx, ny, nzc),
+            origin, reference.GetSpacing(), reference.GetDirection()
+        )
+        q = cp.asarray(sitk.GetArrayViewFromImage(disp))  # [z,y,x,3], T(p) - p
+
+        # add back the reference grid points p
+        zz, yy, xx = cp.meshgrid(cp.arange(nzc), cp.arange(ny), cp.arange(nx), indexing="ij")
+        q += (cp.stack([xx, yy, zz], axis=-1) * r_spacing) @ r_dir.T + cp.asarray(origin)
+
+        cidx = (q - m_origin) @ to_index.T
+        # ITK treats points within half a voxel of the buffer as inside
+        inside = cp.all((cidx >= -0.5) & (cidx <= mov_shape - 0.5), axis=-1)
+        coords = cp.stack([cidx[..., 2], cidx[..., 1], cidx[..., 0]])
+        vals = map_coordinates(mov_gpu, coords, order=_ORDER[interp], mode="nearest")
+        vals = cp.where(inside, vals, default)
+        out[z0:z0 + nzc] = cp.asnumpy(vals).astype(out.dtype)
+
+    img = sitk.GetImageFromArray(out)
+    img.CopyInformation(reference)
+    return img
@@ -1,11 +1,15 @@
 # covid_ct/registration/bspline.py (what even is B-spline?, wait update it was taught in school today)
+import os
 import SimpleITK as sitk
 
+from covid_ct.registration._gpu_resample import resample
+
 def bspline_deformable(
     fixed,
     moving,
     grid=(8, 8, 8),
     iters=100,
+    sampling=0.05,
     shrink_factors=(4, 2, 1),
     smooth_sigmas=(2.0, 1.0, 0.0),
     initial_transform=None,
@@ -32,8 +36,14 @@ def bspline_deformable(
         tx = bspline_tx
 
     reg = sitk.ImageRegistrationMethod()
+    reg.SetNumberOfThreads(os.cpu_count() or 1)  # metric evaluation on all cores
     reg.SetMetricAsMattesMutualInformation(32)
+    reg.SetMetricSamplingStrategy(reg.RANDOM)
+    reg.SetMetricSamplingPercentage(sampling, 42)  # fixed seed -> repeatable runs
     reg.SetInterpolator(sitk.sitkLinear)
+    # gradients at the sampled points only, no precomputed gradient volumes
+    reg.MetricUseFixedImageGradientFilterOff()
+    reg.MetricUseMovingImageGradientFilterOff()
 
     if fixed_mask is not None:
         reg.SetMetricFixedMask(fixed_mask)
@@ -61,13 +71,9 @@ def bspline_deformable(
 
     final_tx = reg.Execute(fixed, moving)
 
-    warped = sitk.Resample(
-        moving, fixed, final_tx, sitk.sitkLinear, 0.0, moving.GetPixelID()
-    )
+    warped = resample(moving, fixed, final_tx, sitk.sitkLinear, 0.0)
     return warped, final_tx
 
 
 def apply_transform(moving, reference, transform):
-    return sitk.Resample(
-        moving, reference, transform, sitk.sitkLinear, 0.0, moving.GetPixelID()
-    )
+    return resample(moving, reference, transform, sitk.sitkLinear, 0.0)
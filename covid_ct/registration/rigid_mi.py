@@ -1,6 +1,9 @@
 # covid_ct/registration/rigid_mi.py
+import os
 import SimpleITK as sitk
 
+from covid_ct.registration._gpu_resample import resample
+
 def rigid_register_mi(
     fixed,
     moving,
@@ -23,6 +26,7 @@ def rigid_register_mi(
     )
 
     reg = sitk.ImageRegistrationMethod()
+    reg.SetNumberOfThreads(os.cpu_count() or 1)  # metric evaluation on all cores
     reg.SetMetricAsMattesMutualInformation(32)
     reg.SetMetricSamplingStrategy(reg.RANDOM)
     reg.SetMetricSamplingPercentage(sampling)
@@ -52,11 +56,9 @@ def rigid_register_mi(
 
     final_tx = reg.Execute(fixed, moving)
 
-    warped = sitk.Resample(
-        moving, fixed, final_tx, sitk.sitkLinear, 0.0, moving.GetPixelID()
-    )
+    warped = resample(moving, fixed, final_tx, sitk.sitkLinear, 0.0)
     return warped, final_tx
 
 def apply_transform(moving, reference, transform):
     """Resample moving onto reference using given transform."""
-    return sitk.Resample(moving, reference, transform, sitk.sitkLinear, 0.0, moving.GetPixelID())
+    return resample(moving, reference, transform, sitk.sitkLinear, 0.0)
@@ -1,5 +1,7 @@
 # covid_ct/segmentation/auto_seed.py
+import numpy as np
 import SimpleITK as sitk
+from scipy import ndimage
 
 def _to_idx(img, phys_pt):
     return list(img.TransformPhysicalPointToIndex(phys_pt))
@@ -58,12 +60,53 @@ def auto_lung_seeds(img, air_hu=-700, min_cc_vox=1500):
 
     return [list(map(int, s)) for s in seeds]
 
+def _air_components(arr, upper, min_cc_vox):
+    # label the [-1000, upper] HU mask (face-connected, like sitk.ConnectedComponent)
+    mask = (arr >= -1000) & (arr <= upper)
+    lbl, n = ndimage.label(mask)
+    sizes = np.bincount(lbl.ravel(), minlength=n + 1)
+    sizes[0] = 0
+    keep = np.flatnonzero(sizes >= min_cc_vox)
+    return mask, lbl, keep[np.argsort(-sizes[keep], kind="stable")]
+
+def auto_lung_seeds_fast(img, air_hu=-700, min_cc_vox=1500):
+    """
+    Vectorized auto_lung_seeds: one scipy labeling of the air mask, sizes via
+    bincount, centroids via center_of_mass. Skips the closing/fill-hole
+    clean-up, so component sizes can differ slightly from auto_lung_seeds.
+    Same fallbacks, same [x,y,z] output.
+    """
+    arr = sitk.GetArrayViewFromImage(img)  # [z,y,x]
+    mask, lbl, keep = _air_components(arr, air_hu, min_cc_vox)
+    if len(keep) == 0:
+        # fallback: relax threshold, keep every component
+        mask, lbl, keep = _air_components(arr, -600, 1)
+
+    sz = img.GetSize()
+    if len(keep) >= 1:
+        coms = ndimage.center_of_mass(mask, lbl, keep[:2].tolist())
+        # (z,y,x) centroids -> [x,y,z] indices
+        cents = [_clamp_idx(img, [int(round(c)) for c in com[::-1]]) for com in coms]
+    if len(keep) >= 2:
+        seeds = cents
+    elif len(keep) == 1:
+        # one big blob: offset left/right of its centroid
+        idx_c = cents[0]
+        seeds = [[max(idx_c[0]-20, 0), idx_c[1], idx_c[2]],
+                 [min(idx_c[0]+20, sz[0]-1), idx_c[1], idx_c[2]]]
+    else:
+        mid = [sz[0]//2, sz[1]//2, sz[2]//2]
+        seeds = [[max(mid[0]-25, 0), mid[1], mid[2]],
+                 [min(mid[0]+25, sz[0]-1), mid[1], mid[2]]]
+
+    return [list(map(int, s)) for s in seeds]
+
 # --- manual seeding helpers (append to auto_seed.py) ---
 import matplotlib.pyplot as plt
 
 def _pick_clicks_on_slice(img, z_index, num_points=2, title="Click inside each lung, then close"):
     """Show one axial slice and collect N mouse clicks (x,y)."""
-    arr = sitk.GetArrayFromImage(img)  # [z,y,x]
+    arr = sitk.GetArrayViewFromImage(img)  # [z,y,x], read-only view (no copy)
     z_index = max(0, min(z_index, arr.shape[0]-1))
     sl = arr[z_index, :, :]
 
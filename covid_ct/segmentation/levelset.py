@@ -1,29 +1,41 @@
 # covid_ct/segmentation/levelset.py
+import threading
+
 import SimpleITK as sitk
 
-def lesion_levelset(
-    img,
+from covid_ct.segmentation.morphology import binary_closing_3d
+
+# one GAC filter for the process; only its scalar settings change between calls
+_GAC = sitk.GeodesicActiveContourLevelSetImageFilter()
+_GAC_LOCK = threading.Lock()
+
+def compute_edge_map(img, edge_sigma=1.0, sigmoid_alpha=-10.0, sigmoid_beta=10.0):
+    """
+    Edge (speed) image for the GAC level set; depends only on img + params.
+    To refine several masks on the same volume, compute it once and pass it
+    to lesion_levelset_with_edge, so the anisotropic diffusion runs once.
+    """
+    # Edge map that attracts the contour to boundaries
+    sm = sitk.CurvatureAnisotropicDiffusion(img, timeStep=0.0625, conductanceParameter=3.0, numberOfIterations=5)
+    grad = sitk.GradientMagnitudeRecursiveGaussian(sm, edge_sigma)
+    edge = sitk.Sigmoid(grad, sigmoid_alpha, sigmoid_beta, 0.0, 1.0)  # low at edges -> high attraction
+    return edge
+
+def lesion_levelset_with_edge(
+    edge,
     init_mask,
     iterations=120,
     curvature=0.5,
     propagation=1.0,
     advection=1.0,
-    edge_sigma=1.0,
-    sigmoid_alpha=-10.0,
-    sigmoid_beta=10.0,
-    post_close=1
+    post_close=1,
+    close_kernel="ball"
 ):
     """
-    Refine an initial infection mask with Geodesic Active Contour (GAC).
-    img:        preprocessed (clipped/normalized) 3D image (sitk.Image, float)
-    init_mask:  binary mask (sitk.Image, 0/1) used to initialize the contour
+    GAC refinement of init_mask on a precomputed edge map (see compute_edge_map).
+    close_kernel: "ball" or "box" (separable) for the post_close closing
     returns:    binary mask (UInt8)
     """
-    # Edge map that attracts the contour to boundaries
-    sm = sitk.CurvatureAnisotropicDiffusion(img, timeStep=0.0625, conductanceParameter=3.0, numberOfIterations=5)
-    grad = sitk.GradientMagnitudeRecursiveGaussian(sm, edge_sigma)
-    edge = sitk.Sigmoid(grad, sigmoid_alpha, sigmoid_beta, 0.0, 1.0)  # low at edges -> high attraction
-
     # Signed distance from init mask (positive inside)
     phi0 = sitk.SignedMaurerDistanceMap(
         sitk.Cast(init_mask > 0, sitk.sitkUInt8),
@@ -31,17 +43,47 @@ def lesion_levelset(
         useImageSpacing=True
     )
 
-    gac = sitk.GeodesicActiveContourLevelSetImageFilter()
-    gac.SetNumberOfIterations(iterations)
-    gac.SetCurvatureScaling(curvature)
-    gac.SetPropagationScaling(propagation)
-    gac.SetAdvectionScaling(advection)
-    out = gac.Execute(phi0, edge)
+    with _GAC_LOCK:
+        _GAC.SetNumberOfIterations(iterations)
+        _GAC.SetCurvatureScaling(curvature)
+        _GAC.SetPropagationScaling(propagation)
+        _GAC.SetAdvectionScaling(advection)
+        out = _GAC.Execute(phi0, edge)
 
     seg = sitk.Cast(out > 0, sitk.sitkUInt8)
 
     # Light post-processing (ran in one try yay, no debugging needed)
     if post_close and post_close > 0:
-        seg = sitk.BinaryMorphologicalClosing(seg, [post_close]*3)
+        seg = binary_closing_3d(seg, post_close, close_kernel)
 
     return seg
+
+def lesion_levelset(
+    img,
+    init_mask,
+    iterations=120,
+    curvature=0.5,
+    propagation=1.0,
+    advection=1.0,
+    edge_sigma=1.0,
+    sigmoid_alpha=-10.0,
+    sigmoid_beta=10.0,
+    post_close=1,
+    close_kernel="ball"
+):
+    """
+    Refine an initial infection mask with Geodesic Active Contour (GAC).
+    img:        preprocessed (clipped/normalized) 3D image (sitk.Image, float)
+    init_mask:  binary mask (sitk.Image, 0/1) used to initialize the contour
+    returns:    binary mask (UInt8)
+    """
+    edge = compute_edge_map(img, edge_sigma, sigmoid_alpha, sigmoid_beta)
+    return lesion_levelset_with_edge(
+        edge, init_mask,
+        iterations=iterations,
+        curvature=curvature,
+        propagation=propagation,
+        advection=advection,
+        post_close=post_close,
+        close_kernel=close_kernel
+    )
@@ -0,0 +1,110 @@
+# covid_ct/segmentation/morphology.py (shared binary morphology for the segmentation steps)
+import numpy as np
+import SimpleITK as sitk
+
+try:
+    from imops import binary_closing as _imops_closing
+    IMOPS = True
+except Exception:
+    IMOPS = False
+
+try:
+    from numba import njit, prange, get_num_threads
+    NUMBA = True
+except Exception:
+    NUMBA = False
+
+def _ball(r):
+    # same footprint as ITK's BinaryBallStructuringElement (semi-axis r + 0.5)
+    zz, yy, xx = np.ogrid[-r:r + 1, -r:r + 1, -r:r + 1]
+    return (xx * xx + yy * yy + zz * zz) <= (r + 0.5) ** 2
+
+def _dilate_separable_box(mask, r):
+    # (2r+1)^3 box as one 1-D line dilation per axis
+    out = mask
+    for axis in range(3):
+        line = [0, 0, 0]; line[axis] = r
+        out = sitk.BinaryDilate(out, line, sitk.sitkBox, 0.0, 1.0)
+    return out
+
+def _closing_separable_box(mask, r):
+    """
+    Closing with a (2r+1)^3 box done as 1-D line dilations/erosions per axis:
+    3 line passes each way instead of one pass over the full cube.
+    Same result as sitk.BinaryMorphologicalClosing(mask, [r]*3, sitk.sitkBox).
+    """
+    if r <= 0:
+        return mask
+    # pad with background like SimpleITK's SafeBorder, so dilation isn't clipped
+    # at the volume edge and the erosion sees the same neighbourhood
+    pad = [r] * mask.GetDimension()
+    out = _dilate_separable_box(sitk.ConstantPad(mask, pad, pad, 0), r)
+    for axis in range(3):
+        line = [0, 0, 0]; line[axis] = r
+        out = sitk.BinaryErode(out, line, sitk.sitkBox, 0.0, 1.0)
+    out = sitk.Crop(out, pad, pad)
+    out.CopyInformation(mask)  # pad/crop round-trips the origin through floats
+    return out
+
+def binary_closing_3d(mask, radius, kernel="ball"):
+    """
+    Binary closing of a 0/1 mask, `radius` in voxels.
+    kernel="ball": ITK ball (imops' multithreaded closing when installed, else SimpleITK).
+    kernel="box":  (2r+1)^3 cube, decomposed into separable 1-D passes.
+    """
+    r = int(radius)
+    if kernel == "box":
+        return _closing_separable_box(mask, r)
+    if kernel != "ball":
+        raise ValueError("kernel must be 'ball' or 'box'")
+    if not IMOPS or mask.GetDimension() != 3:
+        return sitk.BinaryMorphologicalClosing(mask, [r] * 3)
+
+    # pad like SimpleITK's SafeBorder so objects touching the edge don't erode
+    arr = np.pad(sitk.GetArrayViewFromImage(mask) > 0, r)
+    closed = _imops_closing(arr, footprint=_ball(r), num_threads=-1)[r:-r, r:-r, r:-r]
+    out = sitk.GetImageFromArray(closed.astype(np.uint8))
+    out.CopyInformation(mask)
+    return sitk.Cast(out, mask.GetPixelID())
+
+if NUMBA:
+    @njit(parallel=True, cache=True)
+    def _keep_by_size(flat, n_labels, min_size, n_chunks):
+        # pass 1: per-chunk histograms (no shared counters between threads)
+        n = flat.size
+        step = (n + n_chunks - 1) // n_chunks
+        counts = np.zeros((n_chunks, n_labels), dtype=np.int64)
+        for c in prange(n_chunks):
+            for i in range(c * step, min(n, (c + 1) * step)):
+                counts[c, flat[i]] += 1
+        keep = np.zeros(n_labels, dtype=np.uint8)
+        for l in prange(1, n_labels):
+            total = 0
+            for c in range(n_chunks):
+                total += counts[c, l]
+            if total >= min_size:
+                keep[l] = 1
+        # pass 2: write the kept voxels
+        out = np.empty(n, dtype=np.uint8)
+        for i in prange(n):
+            out[i] = keep[flat[i]]
+        return out
+
+def remove_small_components(mask, min_size):
+    """
+    Keep connected components (face-connected) with at least min_size voxels.
+    Returns a UInt8 0/1 mask. Sizes are counted and the output written in two
+    parallel Numba passes when available, else RelabelComponent's min size.
+    """
+    cc = sitk.ConnectedComponent(mask)
+    if not NUMBA:
+        relab = sitk.RelabelComponentImageFilter()
+        relab.SetMinimumObjectSize(int(min_size))
+        return sitk.Cast(relab.Execute(cc) > 0, sitk.sitkUInt8)
+
+    lbl = sitk.GetArrayViewFromImage(cc)
+    n_labels = int(lbl.max()) + 1
+    kept = _keep_by_size(lbl.ravel(), n_labels, int(min_size), get_num_threads())
+    out = sitk.GetImageFromArray(kept.reshape(lbl.shape))
+    out.CopyInformation(mask)
+    return out
@@ -0,0 +1,32 @@
+# covid_ct/viz/_kernels.py (optional Numba kernels for the QC overlay)
+try:
+    from numba import njit, prange
+    NUMBA = True
+except Exception:
+    NUMBA = False
+
+if NUMBA:
+    @njit(parallel=True, cache=True)
+    def composite_boundaries(gray, lung, inf, palette, out):
+        """
+        One pass over a 2-D slice: gray -> RGB, with lung / infection boundary
+        pixels (value differs from the pixel above or to the left, as
+        overlay._boundary) painted from palette[code], code = lung | inf << 1.
+        """
+        h, w = gray.shape
+        for i in prange(h):
+            for j in range(w):
+                code = 0
+                lv = lung[i, j] > 0
+                if (i > 0 and lv != (lung[i - 1, j] > 0)) or (j > 0 and lv != (lung[i, j - 1] > 0)):
+                    code |= 1
+                iv = inf[i, j] > 0
+                if (i > 0 and iv != (inf[i - 1, j] > 0)) or (j > 0 and iv != (inf[i, j - 1] > 0)):
+                    code |= 2
+                if code:
+                    for c in range(3):
+                        out[i, j, c] = palette[code, c]
+                else:
+                    g = gray[i, j]
+                    for c in range(3):
+                        out[i, j, c] = g
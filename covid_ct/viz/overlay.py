@@ -0,0 +1,65 @@
+# covid_ct/viz/overlay.py (QC overlay PNG straight from numpy, no matplotlib figure)
+import numpy as np
+
+try:
+    import imageio.v2 as imageio
+    IMAGEIO = True
+except Exception:
+    IMAGEIO = False
+
+try:
+    import cv2
+    CV2 = True
+except Exception:
+    CV2 = False
+
+from covid_ct.viz._kernels import NUMBA
+if NUMBA:
+    from covid_ct.viz._kernels import composite_boundaries
+
+LUNG_RGB = (0, 255, 255)   # cyan
+INF_RGB = (255, 0, 255)    # magenta
+
+# colour per packed boundary code: bit0 = lung, bit1 = infection (infection wins)
+_PALETTE = np.array([(0, 0, 0), LUNG_RGB, INF_RGB, INF_RGB], dtype=np.uint8)
+
+def _boundary(mask):
+    """Pixels where a 2-D 0/1 mask changes value along y or x (XOR with a shifted copy)."""
+    m = np.asarray(mask) > 0
+    edge_y = m ^ np.roll(m, 1, axis=0)
+    edge_x = m ^ np.roll(m, 1, axis=1)
+    edge_y[0, :] = False  # roll wraps around; the first row/col has no predecessor
+    edge_x[:, 0] = False
+    return edge_y | edge_x
+
+def _gray_u8(image_slice):
+    """Min/max scale a 2-D slice to uint8 (cv2.normalize's SIMD kernel when available)."""
+    if CV2:
+        return cv2.normalize(np.ascontiguousarray(image_slice), None, 0, 255,
+                             cv2.NORM_MINMAX, dtype=cv2.CV_8U)
+    img = np.asarray(image_slice, dtype=np.float32)
+    lo, hi = float(img.min()), float(img.max())
+    scale = 255.0 / (hi - lo) if hi > lo else 0.0
+    return ((img - lo) * scale).astype(np.uint8)
+
+def save_overlay_fast(image_slice, lung_slice, inf_slice, out_png):
+    """
+    Write a QC overlay of one 2-D slice: CT in gray (min/max scaled, like imshow),
+    lung boundary in cyan, infection boundary in magenta.
+    Needs imageio (check IMAGEIO); callers fall back to matplotlib without it.
+    """
+    gray = _gray_u8(image_slice)
+    if NUMBA:
+        # boundaries + composite fused into one parallel pass
+        rgb = np.empty(gray.shape + (3,), dtype=np.uint8)
+        composite_boundaries(gray, np.ascontiguousarray(lung_slice),
+                             np.ascontiguousarray(inf_slice), _PALETTE, rgb)
+        imageio.imwrite(str(out_png), rgb)
+        return
+
+    rgb = np.repeat(gray[..., None], 3, axis=2)
+    # pack both boundaries into one 2-bit code, then one gather from the palette
+    code = _boundary(lung_slice).view(np.uint8) | (_boundary(inf_slice).view(np.uint8) << 1)
+    hit = code > 0
+    rgb[hit] = _PALETTE[code[hit]]
+    imageio.imwrite(str(out_png), rgb)
@@ -1,43 +1,66 @@
 # scripts/make_3d.py
-import SimpleITK as sitk
+import sys, os
 import numpy as np
 from pathlib import Path
-import tkinter as tk
 from tkinter import filedialog, messagebox
-from skimage.measure import marching_cubes
-import trimesh
+# SimpleITK, skimage, trimesh and pyvista (VTK) are imported where they are used:
+# together they take seconds to load, and the folder picker should come up first
 
-try:
-    import pyvista as pv
-    PV = True
-except Exception:
-    PV = False
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from scripts._tk_root import root
+
+
+def _pyvista():
+    """pyvista module, or None if it isn't installed."""
+    try:
+        import pyvista as pv
+        return pv
+    except Exception:
+        return None
 
 
 def pick_case_folder():
-    root = tk.Tk(); root.withdraw(); root.update()
     d = filedialog.askdirectory(
-        title="Select processed case folder (with NIfTIs)"
+        parent=root(), title="Select processed case folder (with NIfTIs)"
     )
-    root.destroy()
     if not d:
         raise RuntimeError("No folder selected.")
     return Path(d)
 
 
 def mesh_from_mask(mask_img):
-    arr = sitk.GetArrayFromImage(mask_img).astype(np.uint8)
-    if arr.max() == 0:
+    import SimpleITK as sitk
+    try:
+        import mcubes  # PyMCubes: C++ marching cubes, faster than skimage's
+    except Exception:
+        mcubes = None
+
+    # view of the sitk buffer; masks are already uint8 so normally no copy
+    arr = sitk.GetArrayViewFromImage(mask_img)
+    if arr.dtype != np.uint8:
+        arr = arr.astype(np.uint8)
+    if not arr.any():  # stops at the first nonzero voxel
         raise RuntimeError("Mask is empty.")
     # marching_cubes expects z, y, x spacing; SimpleITK spacing is x, y, z
     spacing = mask_img.GetSpacing()[::-1]
+    if mcubes is not None:
+        # PyMCubes gives vertices in voxel units (z, y, x)
+        verts, faces = mcubes.marching_cubes(arr, 0.5)
+        return verts * np.asarray(spacing), faces
+    from skimage.measure import marching_cubes
     verts, faces, _, _ = marching_cubes(arr, level=0.5, spacing=spacing)
     return verts, faces
 
 
 def save_stl(verts, faces, out_path):
-    # trimesh wants faces as (N, 3)
-    mesh = trimesh.Trimesh(vertices=verts[:, ::-1], faces=faces.astype(np.int64))
+    import trimesh
+    # trimesh wants faces as (N, 3); verts are (z, y, x), write x, y, z straight
+    # into one contiguous buffer (trimesh would copy a verts[:, ::-1] view anyway)
+    xyz = np.empty_like(verts)
+    xyz[:, 0] = verts[:, 2]
+    xyz[:, 1] = verts[:, 1]
+    xyz[:, 2] = verts[:, 0]
+    mesh = trimesh.Trimesh(vertices=xyz, faces=faces.astype(np.int64, copy=False))
     mesh.export(out_path)
 
 
@@ -46,14 +69,20 @@ def pv_polydata_from_mesh(verts, faces):
     Build a PyVista PolyData from marching_cubes output.
     faces must be (N, 3); PyVista wants a flat array [3, i, j, k, 3, ...].
     """
+    import pyvista as pv
     n_faces = faces.shape[0]
-    faces_pv = np.hstack(
-        [np.full((n_faces, 1), 3, dtype=np.int64), faces.astype(np.int64)]
-    ).ravel()
-    return pv.PolyData(verts, faces_pv)
+    # fill one (N, 4) buffer in place; ravel of a C-contiguous array is a view
+    faces_pv = np.empty((n_faces, 4), dtype=np.int64)
+    faces_pv[:, 0] = 3
+    faces_pv[:, 1:] = faces
+    return pv.PolyData(verts, faces_pv.ravel())
 
 
 def main():
+    import SimpleITK as sitk
+    pv = _pyvista()
+    PV = pv is not None
+
     try:
         case = pick_case_folder()
 
@@ -120,12 +149,10 @@ def main():
             p.show(screenshot=str(case / "lung_infection_3d.png"))
             print("Saved combined 3D render:", case / "lung_infection_3d.png")
 
-        tk.Tk().withdraw()
-        messagebox.showinfo("Done", f"3D models saved in:\n{case}")
+        messagebox.showinfo("Done", f"3D models saved in:\n{case}", parent=root())
 
     except Exception as e:
-        tk.Tk().withdraw()
-        messagebox.showerror("Error", str(e))
+        messagebox.showerror("Error", str(e), parent=root())
         print("Error:", e)
 
 
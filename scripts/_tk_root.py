@@ -0,0 +1,20 @@
+# scripts/_tk_root.py (one hidden Tk root shared by all the pickers/messageboxes)
+import atexit
+import tkinter as tk
+
+_ROOT = None
+
+def root():
+    """Hidden Tk root, created on first use and destroyed at exit."""
+    global _ROOT
+    if _ROOT is None:
+        _ROOT = tk.Tk(); _ROOT.withdraw()
+        atexit.register(_destroy)
+    return _ROOT
+
+def _destroy():
+    global _ROOT
+    if _ROOT is not None:
+        try: _ROOT.destroy()
+        except Exception: pass
+        _ROOT = None
@@ -1,24 +1,21 @@
 # scripts/batch_gui.py
 import sys, os, argparse
 from pathlib import Path
-import tkinter as tk
 from tkinter import filedialog, messagebox
 
 # allow imports of our batch code
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 import scripts.batch_process as batch  # reuse the functions you already have
+from scripts._tk_root import root as tk_root
 
 def pick_folder(title):
-    r=tk.Tk(); r.withdraw(); r.update()
-    d=filedialog.askdirectory(title=title); r.destroy()
+    d=filedialog.askdirectory(parent=tk_root(), title=title)
     if not d: raise RuntimeError("No folder selected.")
     return d
 
 def pick_save_csv(default="batch_log.csv"):
-    r=tk.Tk(); r.withdraw(); r.update()
-    f=filedialog.asksaveasfilename(title="Save batch log CSV as…", initialfile=default,
+    f=filedialog.asksaveasfilename(parent=tk_root(), title="Save batch log CSV as…", initialfile=default,
                                    defaultextension=".csv", filetypes=[("CSV","*.csv")])
-    r.destroy()
     if not f: raise RuntimeError("No file selected.")
     return f
 
@@ -31,9 +28,9 @@ def main():
         out_root = args.out_root or pick_folder("Pick OUTPUT ROOT folder (results will mirror the tree)")
         log_csv = args.log_csv or pick_save_csv()
         batch.main(root, out_root, log_csv)  # calls your existing function
-        tk.Tk().withdraw(); messagebox.showinfo("Done", f"Processed. Log saved at:\n{log_csv}")
+        messagebox.showinfo("Done", f"Processed. Log saved at:\n{log_csv}", parent=tk_root())
     except Exception as e:
-        try: tk.Tk().withdraw(); messagebox.showerror("Error", str(e))
+        try: messagebox.showerror("Error", str(e), parent=tk_root())
         except: pass
         print("Error:", e)
 
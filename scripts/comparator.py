@@ -1,41 +1,41 @@
 # scripts/comparator.py
-import argparse, sys
+import argparse, sys, os
 from pathlib import Path
 import numpy as np
-import SimpleITK as sitk
-import matplotlib.pyplot as plt
 import tkinter as tk
 from tkinter import filedialog, messagebox
+# SimpleITK / matplotlib are imported inside the functions that use them,
+# so the pickers (and --help) come up without paying for those imports
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from scripts._tk_root import root
 
 # ---------- pickers ----------
 def choose_folder(title):
-    root = tk.Tk(); root.withdraw(); root.update()
-    folder = filedialog.askdirectory(title=title)
-    root.destroy()
+    folder = filedialog.askdirectory(parent=root(), title=title)
     if not folder: raise RuntimeError("No folder selected.")
     return folder
 
 def choose_file(title, patterns):
-    root = tk.Tk(); root.withdraw(); root.update()
-    f = filedialog.askopenfilename(title=title, filetypes=patterns)
-    root.destroy()
+    f = filedialog.askopenfilename(parent=root(), title=title, filetypes=patterns)
     if not f: raise RuntimeError("No file selected.")
     return f
 
 def choose_plane_dialog(default="axial"):
-    root = tk.Tk(); root.title("Pick viewing plane")
-    var = tk.StringVar(value=default)
+    win = tk.Toplevel(root()); win.title("Pick viewing plane")
+    var = tk.StringVar(master=win, value=default)
     for text, val in [("Axial (Z)", "axial"), ("Coronal (Y)", "coronal"), ("Sagittal (X)", "sagittal")]:
-        tk.Radiobutton(root, text=text, variable=var, value=val, anchor="w").pack(fill="x", padx=12, pady=4)
+        tk.Radiobutton(win, text=text, variable=var, value=val, anchor="w").pack(fill="x", padx=12, pady=4)
     chosen = {"val": None}
-    def ok(): chosen["val"] = var.get(); root.destroy()
-    tk.Button(root, text="OK", command=ok).pack(padx=12, pady=12)
-    root.mainloop()
+    def ok(): chosen["val"] = var.get(); win.destroy()
+    tk.Button(win, text="OK", command=ok).pack(padx=12, pady=12)
+    root().wait_window(win)
     if not chosen["val"]: raise RuntimeError("No plane chosen.")
     return chosen["val"]
 
 # ---------- I/O & helpers ----------
 def load_dicom_series(dicom_dir):
+    import SimpleITK as sitk
     r = sitk.ImageSeriesReader()
     ids = r.GetGDCMSeriesIDs(str(dicom_dir))
     if not ids: raise RuntimeError(f"No DICOM series found in {dicom_dir}")
@@ -43,14 +43,31 @@ def load_dicom_series(dicom_dir):
     r.SetFileNames(files)
     return r.Execute()
 
-def resample_like(img, reference, interp=sitk.sitkLinear):
+def resample_like(img, reference, interp=None):
+    import SimpleITK as sitk
+    if interp is None: interp = sitk.sitkLinear
     return sitk.Resample(img, reference, sitk.Transform(), interp, 0.0, sitk.sitkFloat32)
 
+def read_slice(reader, plane, idx):
+    """
+    Read one slice (index idx along plane) of the file behind an ImageFileReader
+    that has had ReadImageInformation() called. Only that slab is read from disk;
+    the result is a 3-D image, 1 voxel thick, with the slice's physical geometry.
+    """
+    axis = {"sagittal": 0, "coronal": 1, "axial": 2}[plane]
+    size = list(reader.GetSize()); size[axis] = 1
+    index = [0, 0, 0]; index[axis] = int(idx)
+    reader.SetExtractIndex(index)
+    reader.SetExtractSize(size)
+    return reader.Execute()
+
 def np_slice(img, plane, idx):
-    a = sitk.GetArrayFromImage(img)  # [z,y,x]
-    if plane == "axial":    idx = np.clip(idx, 0, a.shape[0]-1); return a[idx, :, :]
-    if plane == "coronal":  idx = np.clip(idx, 0, a.shape[1]-1); return a[:, idx, :]
-    if plane == "sagittal": idx = np.clip(idx, 0, a.shape[2]-1); return a[:, :, idx]
+    import SimpleITK as sitk
+    # view of the sitk buffer (no full-volume copy); only the slice gets copied
+    a = sitk.GetArrayViewFromImage(img)  # [z,y,x]
+    if plane == "axial":    idx = np.clip(idx, 0, a.shape[0]-1); return np.array(a[idx, :, :])
+    if plane == "coronal":  idx = np.clip(idx, 0, a.shape[1]-1); return np.array(a[:, idx, :])
+    if plane == "sagittal": idx = np.clip(idx, 0, a.shape[2]-1); return np.array(a[:, :, idx])
     raise ValueError("plane must be axial/coronal/sagittal")
 
 def size_along(img, plane):
@@ -58,22 +75,33 @@ def size_along(img, plane):
     return {"axial": z, "coronal": y, "sagittal": x}[plane]
 
 # ---------- core ----------
-def compare(dicom_dir, proc_file, plane="axial", slice_idx=None, save=None):
+def compare(dicom_dir, proc_file, plane="axial", slice_idx=None, save=None, full=False):
+    import SimpleITK as sitk
+    import matplotlib.pyplot as plt
+
     print("Loading original DICOM from:\n ", dicom_dir)
     print("Loading processed image:\n ", proc_file)
 
     raw  = load_dicom_series(dicom_dir)
-    proc = sitk.ReadImage(proc_file)
+    # header only; the processed volume is read slice-wise unless --full
+    reader = sitk.ImageFileReader()
+    reader.SetFileName(str(proc_file))
+    reader.ReadImageInformation()
 
-    # Align raw to processed geometry
-    raw_on_proc = resample_like(raw, proc, interp=sitk.sitkLinear)
-
-    n_slices = size_along(proc, plane)
+    n_slices = size_along(reader, plane)
     if slice_idx is None: slice_idx = n_slices // 2
     slice_idx = int(np.clip(slice_idx, 0, n_slices-1))
 
-    raw_np  = np_slice(raw_on_proc, plane, slice_idx)
-    proc_np = np_slice(proc,       plane, slice_idx)
+    # Align raw to processed geometry (only the displayed slice unless --full)
+    if full:
+        proc = reader.Execute()
+        raw_on_proc = resample_like(raw, proc, interp=sitk.sitkLinear)
+        raw_np  = np_slice(raw_on_proc, plane, slice_idx)
+        proc_np = np_slice(proc,        plane, slice_idx)
+    else:
+        proc_sl = read_slice(reader, plane, slice_idx)
+        raw_np  = np_slice(resample_like(raw, proc_sl, interp=sitk.sitkLinear), plane, 0)
+        proc_np = np_slice(proc_sl, plane, 0)
 
     # Plot
     plt.figure(figsize=(12, 6))
@@ -102,6 +130,7 @@ def main():
     ap.add_argument("--plane", choices=["axial","coronal","sagittal"])
     ap.add_argument("--slice", type=int)
     ap.add_argument("--save")
+    ap.add_argument("--full", action="store_true", help="Load/resample the whole volumes (debugging).")
     args = ap.parse_args()
 
     auto_pick = (len(sys.argv) == 1) or (not args.dicom_dir or not args.processed_file) or (args.plane is None)
@@ -119,13 +148,11 @@ def main():
             if args.plane is None:
                 plane = choose_plane_dialog(default="axial")
 
-        compare(dicom_dir, proc_file, plane=plane, slice_idx=args.slice, save=args.save)
+        compare(dicom_dir, proc_file, plane=plane, slice_idx=args.slice, save=args.save, full=args.full)
 
     except Exception as e:
         try:
-            root = tk.Tk(); root.withdraw()
-            messagebox.showerror("Error", str(e))
-            root.destroy()
+            messagebox.showerror("Error", str(e), parent=root())
         except Exception:
             pass
         print("Error:", e)
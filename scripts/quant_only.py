@@ -1,17 +1,15 @@
 # scripts/quant_only.py (Why am I even bothering writing comments at this point, nobody reads them)
 import sys, os, argparse, json
 from pathlib import Path
-import tkinter as tk
 from tkinter import filedialog, messagebox
 import SimpleITK as sitk
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from covid_ct.quantification.quantify import percent_infected, lesion_stats
+from scripts._tk_root import root as tk_root
 
 def pick_case_dir():
-    r=tk.Tk(); r.withdraw(); r.update()
-    d=filedialog.askdirectory(title="Select processed case folder (contains image_resampled.nii.gz, mask_*.nii.gz)")
-    r.destroy()
+    d=filedialog.askdirectory(parent=tk_root(), title="Select processed case folder (contains image_resampled.nii.gz, mask_*.nii.gz)")
     if not d: raise RuntimeError("No folder selected.")
     return Path(d)
 
@@ -32,9 +30,9 @@ def main():
                   "percent_infected": pct, **lst}
         (case_dir/"report.json").write_text(json.dumps(report, indent=2))
         print(json.dumps(report, indent=2))
-        tk.Tk().withdraw(); messagebox.showinfo("Done", f"Saved report.json in:\n{case_dir}")
+        messagebox.showinfo("Done", f"Saved report.json in:\n{case_dir}", parent=tk_root())
     except Exception as e:
-        try: tk.Tk().withdraw(); messagebox.showerror("Error", str(e))
+        try: messagebox.showerror("Error", str(e), parent=tk_root())
         except: pass
         print("Error:", e)
 
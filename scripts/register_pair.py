@@ -1,7 +1,6 @@
 # scripts/register_pair.py
 import sys, os, argparse
 from pathlib import Path
-import tkinter as tk
 from tkinter import filedialog, messagebox
 import SimpleITK as sitk
 
@@ -10,16 +9,15 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from covid_ct.io.dicom import read_dicom_series, write_nifti
 from covid_ct.registration.rigid_mi import rigid_register_mi
 from covid_ct.registration.bspline import bspline_deformable
+from scripts._tk_root import root as tk_root
 
 def pick_folder(title):
-    r=tk.Tk(); r.withdraw(); r.update()
-    d=filedialog.askdirectory(title=title); r.destroy()
+    d=filedialog.askdirectory(parent=tk_root(), title=title)
     if not d: raise RuntimeError("Selection cancelled.")
     return d
 
 def pick_out_dir(default_name="registered"):
-    r=tk.Tk(); r.withdraw(); r.update()
-    d=filedialog.askdirectory(title="Select output folder (a subfolder will be created)"); r.destroy()
+    d=filedialog.askdirectory(parent=tk_root(), title="Select output folder (a subfolder will be created)")
     if not d: raise RuntimeError("No output folder selected.")
     out = Path(d)/default_name; out.mkdir(parents=True, exist_ok=True); return str(out)
 
@@ -59,9 +57,9 @@ def main():
         default_name = f"{Path(moving_dir).name}_to_{Path(fixed_dir).name}"
         out_dir = args.out_dir or pick_out_dir(default_name)
         run_once(fixed_dir, moving_dir, out_dir, do_bspline=args.bspline)
-        tk.Tk().withdraw(); messagebox.showinfo("Done", f"Outputs saved to:\n{out_dir}")
+        messagebox.showinfo("Done", f"Outputs saved to:\n{out_dir}", parent=tk_root())
     except Exception as e:
-        try: tk.Tk().withdraw(); messagebox.showerror("Error", str(e))
+        try: messagebox.showerror("Error", str(e), parent=tk_root())
         except: pass
         print("Error:", e)
 
@@ -1,27 +1,59 @@
 # scripts/run_pipeline.py
-import argparse, json, yaml
+import argparse, json, os, yaml
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 import SimpleITK as sitk
 
-from covid_ct.io.dicom import read_dicom_series, write_nifti
-from covid_ct.preprocess.resample import clip_and_norm, resample_isotropic
-from covid_ct.segmentation.auto_seed import auto_lung_seeds
+try:
+    import matplotlib
+    matplotlib.use("Agg")  # headless: picked before anything imports pyplot
+    from matplotlib.figure import Figure
+    MPL = True
+except Exception:
+    MPL = False
+
+from covid_ct.io.dicom import read_dicom_series, write_nifti_fast
+from covid_ct.preprocess.resample import preprocess_fused
+from covid_ct.segmentation.auto_seed import auto_lung_seeds_fast
 from covid_ct.segmentation.region_growing import lung_mask_region_growing
 from covid_ct.segmentation.levelset import lesion_levelset
 from covid_ct.quantification.quantify import percent_infected, lesion_stats
+from covid_ct.viz.overlay import IMAGEIO, save_overlay_fast
+
+# use every core in the SimpleITK filters, via ITK's thread pool
+sitk.ProcessObject.SetGlobalDefaultNumberOfThreads(os.cpu_count() or 1)
+sitk.ProcessObject.SetGlobalDefaultThreader("POOL")
+
+_FIG = None
+
+def _overlay_axes():
+    # one off-screen Figure (not tracked by pyplot), cleared and reused per overlay
+    global _FIG
+    if _FIG is None:
+        _FIG = Figure()
+        _FIG.add_subplot()
+    ax = _FIG.axes[0]
+    ax.cla()
+    return _FIG, ax
 
 def save_overlay(image, lung, inf, out_png, z=None):
     if z is None or z <= 0:
         z = image.GetSize()[2] // 2
-    arr = sitk.GetArrayFromImage(image)[:, :, z]
-    lung2d = sitk.GetArrayFromImage(lung)[:, :, z]
-    inf2d  = sitk.GetArrayFromImage(inf)[:, :, z]
-    import matplotlib.pyplot as plt
-    plt.figure()
-    plt.imshow(arr, cmap='gray')
-    plt.contour(lung2d == 1, linewidths=0.7)   # lungs
-    plt.contour(inf2d  == 1, linewidths=0.7)   # infection
-    plt.axis('off'); plt.savefig(out_png, bbox_inches='tight', dpi=200); plt.close()
+    # extract just the axial slice; only that 2-D slice gets copied to numpy
+    size = [image.GetSize()[0], image.GetSize()[1], 0]
+    arr = sitk.GetArrayFromImage(sitk.Extract(image, size, [0, 0, z]))
+    lung2d = sitk.GetArrayFromImage(sitk.Extract(lung, size, [0, 0, z]))
+    inf2d  = sitk.GetArrayFromImage(sitk.Extract(inf, size, [0, 0, z]))
+    if IMAGEIO:
+        save_overlay_fast(arr, lung2d, inf2d, out_png)
+        return
+    if not MPL:
+        raise RuntimeError("save_overlay needs imageio or matplotlib.")
+    fig, ax = _overlay_axes()
+    ax.imshow(arr, cmap='gray')
+    ax.contour(lung2d == 1, linewidths=0.7)   # lungs
+    ax.contour(inf2d  == 1, linewidths=0.7)   # infection
+    ax.axis('off'); fig.savefig(out_png, bbox_inches='tight', dpi=200)
 
 def main(cfg_path, dicom_dir, out_dir):
     out = Path(out_dir); out.mkdir(parents=True, exist_ok=True)
@@ -29,40 +61,53 @@ def main(cfg_path, dicom_dir, out_dir):
 
     # --- 1) Read DICOM + preprocess ---
     img_raw = read_dicom_series(dicom_dir)
-    img_clip = sitk.Clamp(img_raw, sitk.sitkFloat32, *cfg["preprocess"]["clip_hu"])
-    img_r = resample_isotropic(img_clip, tuple(cfg["preprocess"]["target_spacing"]))
-    img_n = clip_and_norm(img_r, *cfg["preprocess"]["clip_hu"], cfg["preprocess"]["zscore"])
+    img_r, img_n = preprocess_fused(
+        img_raw, *cfg["preprocess"]["clip_hu"],
+        target_spacing=cfg["preprocess"]["target_spacing"],
+        zscore=cfg["preprocess"]["zscore"]
+    )
+    del img_raw  # full-resolution volume isn't needed past this point
 
     # --- 2) Seeds (config list or auto) ---
     seeds = cfg["segmentation"]["region_growing"].get("seeds") or []
     if not seeds:
-        seeds = auto_lung_seeds(img_r, air_hu=-700)
+        seeds = auto_lung_seeds_fast(img_r, air_hu=-700)
     print("Seeds:", seeds)
 
     # --- 3) Segmentation: lungs + infection ---
-    lung = lung_mask_region_growing(
-        img_r, seeds,
-        lower=cfg["segmentation"]["region_growing"]["lower"],
-        upper=cfg["segmentation"]["region_growing"]["upper"]
-    )
-    thr = sitk.BinaryThreshold(img_n, 0.55, 1.0)   # crude init; tweak later if needed
+    # independent until the &; SimpleITK releases the GIL, so overlap them
+    with ThreadPoolExecutor(2) as ex:
+        f_lung = ex.submit(
+            lung_mask_region_growing, img_r, seeds,
+            lower=cfg["segmentation"]["region_growing"]["lower"],
+            upper=cfg["segmentation"]["region_growing"]["upper"]
+        )
+        f_thr = ex.submit(sitk.BinaryThreshold, img_n, 0.55, 1.0)   # crude init; tweak later if needed
+        lung, thr = f_lung.result(), f_thr.result()
     infection_init = thr & lung
+    del thr
     infection = lesion_levelset(
         img_n, infection_init,
         iterations=cfg["segmentation"]["levelset"]["iterations"],
         curvature=cfg["segmentation"]["levelset"]["curvature"],
         propagation=cfg["segmentation"]["levelset"]["propagation"],
-        advection=cfg["segmentation"]["levelset"]["advection"]
+        advection=cfg["segmentation"]["levelset"]["advection"],
+        close_kernel="box"
     )
+    del infection_init, img_n
 
     # --- 4) Quantification ---
     pct = percent_infected(lung, infection, cfg["quantification"]["min_lesion_cc"])
     lst = lesion_stats(infection)
 
     # --- 5) Save outputs ---
-    write_nifti(img_r, out / "image_resampled.nii.gz")
-    write_nifti(lung, out / "mask_lung.nii.gz")
-    write_nifti(infection, out / "mask_infection.nii.gz")
+    with ThreadPoolExecutor(3) as ex:
+        writes = [
+            ex.submit(write_nifti_fast, img_r, out / "image_resampled.nii.gz"),
+            ex.submit(write_nifti_fast, lung, out / "mask_lung.nii.gz"),
+            ex.submit(write_nifti_fast, infection, out / "mask_infection.nii.gz"),
+        ]
+        for f in writes: f.result()   # re-raise write errors here
 
     report = {
         "dicom_dir": str(dicom_dir),
@@ -79,10 +124,58 @@ def main(cfg_path, dicom_dir, out_dir):
 
     print(f"Done. % infected = {pct:.2f} | outputs -> {out}")
 
+def _init_worker(n_threads):
+    # split the cores between workers instead of every worker using all of them.
+    # Workers are forked with numpy's BLAS/OpenMP pools already set up, so an
+    # OMP_NUM_THREADS set now would be ignored: resize the pools at runtime instead.
+    sitk.ProcessObject.SetGlobalDefaultNumberOfThreads(n_threads)
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(n_threads)  # kept for the worker's lifetime
+    except Exception:
+        pass
+    try:
+        import numba
+        numba.set_num_threads(min(n_threads, numba.config.NUMBA_NUM_THREADS))
+    except Exception:
+        pass
+
+def _run_one(job):
+    cfg_path, dicom_dir, out_dir = job
+    try:
+        main(cfg_path, dicom_dir, out_dir)
+        return dicom_dir, None
+    except Exception as e:
+        return dicom_dir, str(e)
+
+def run_many(cfg_path, studies, max_workers=None):
+    """
+    Run main() over [(dicom_dir, out_dir), ...] on one warm process pool, so
+    interpreter start-up and the SimpleITK/numpy imports are paid once per worker.
+    Returns [(dicom_dir, error or None), ...] in input order.
+    """
+    ncpu = os.cpu_count() or 1
+    workers = max_workers or max(1, min(4, ncpu // 4))
+    threads = max(1, ncpu // workers)
+    jobs = [(cfg_path, d, o) for d, o in studies]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(threads,)) as ex:
+        results = list(ex.map(_run_one, jobs))
+    for d, err in results:
+        if err: print(f"FAILED {d}: {err}")
+    return results
+
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
     ap.add_argument("--config", default="configs/default.yaml")
-    ap.add_argument("--dicom_dir", required=True)
-    ap.add_argument("--out_dir", required=True)
+    ap.add_argument("--dicom_dir")
+    ap.add_argument("--out_dir")
+    ap.add_argument("--studies_json", help='JSON list of {"dicom_dir": ..., "out_dir": ...} to run as a batch.')
+    ap.add_argument("--workers", type=int, help="Worker processes for --studies_json.")
     args = ap.parse_args()
-    main(args.config, args.dicom_dir, args.out_dir)
+    if args.studies_json:
+        studies = json.loads(Path(args.studies_json).read_text())
+        run_many(args.config, [(s["dicom_dir"], s["out_dir"]) for s in studies], args.workers)
+    elif args.dicom_dir and args.out_dir:
+        main(args.config, args.dicom_dir, args.out_dir)
+    else:
+        ap.error("--dicom_dir and --out_dir are required (or pass --studies_json)")
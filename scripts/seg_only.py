@@ -1,36 +1,59 @@
 # scripts/seg_only.py
 import argparse, sys, os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import numpy as np
 import SimpleITK as sitk
-import tkinter as tk
+from scipy import ndimage
 from tkinter import filedialog, messagebox
 
+# no Agg here: manual seed picking (auto_seed) needs an interactive backend
+try:
+    from matplotlib.figure import Figure
+    MPL = True
+except Exception:
+    MPL = False
+
 # make imports work even if run directly
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from covid_ct.io.dicom import read_dicom_series, write_nifti
-from covid_ct.preprocess.resample import clip_and_norm, resample_isotropic
+from covid_ct.io.dicom import read_dicom_series, write_nifti_fast
+from covid_ct.preprocess.resample import preprocess_fused
 from covid_ct.segmentation.region_growing import lung_mask_region_growing
 from covid_ct.segmentation.levelset import lesion_levelset  # kept for other scripts
-
+from covid_ct.segmentation.morphology import binary_closing_3d, remove_small_components
+from covid_ct.viz.overlay import IMAGEIO, save_overlay_fast
+from scripts._tk_root import root as tk_root
+
+# use every core in the SimpleITK filters, via ITK's thread pool
+sitk.ProcessObject.SetGlobalDefaultNumberOfThreads(os.cpu_count() or 1)
+sitk.ProcessObject.SetGlobalDefaultThreader("POOL")
+
+_FIG = None
+
+def _overlay_axes():
+    # one off-screen Figure (not tracked by pyplot, so never shown), reused per overlay
+    global _FIG
+    if _FIG is None:
+        _FIG = Figure(figsize=(6, 6))
+        _FIG.add_subplot()
+    ax = _FIG.axes[0]
+    ax.cla()
+    return _FIG, ax
 
 # ---------- GUI pickers ----------
 def pick_dicom_dir():
-    root = tk.Tk(); root.withdraw(); root.update()
     d = filedialog.askdirectory(
-        title="Select DICOM series folder (contains .dcm files)"
+        parent=tk_root(), title="Select DICOM series folder (contains .dcm files)"
     )
-    root.destroy()
     if not d:
         raise RuntimeError("No DICOM folder selected.")
     return d
 
 
 def pick_out_dir(default_name="output"):
-    root = tk.Tk(); root.withdraw(); root.update()
     d = filedialog.askdirectory(
-        title="Select output folder (a subfolder will be created)"
+        parent=tk_root(), title="Select output folder (a subfolder will be created)"
     )
-    root.destroy()
     if not d:
         raise RuntimeError("No output folder selected.")
     out = Path(d) / default_name
@@ -43,20 +66,26 @@ def save_overlay(image, lung, inf, out_png, z=None):
     if z is None or z <= 0:
         z = image.GetSize()[2] // 2
 
-    arr = sitk.GetArrayFromImage(image)[z, :, :]
-    l2d = sitk.GetArrayFromImage(lung)[z, :, :]
-    i2d = sitk.GetArrayFromImage(inf)[z, :, :]
-
-    import matplotlib.pyplot as plt
-
-    plt.figure(figsize=(6, 6))
-    plt.imshow(arr, cmap="gray")
+    # extract just the axial slice; only that 2-D slice gets copied to numpy
+    size = [image.GetSize()[0], image.GetSize()[1], 0]
+    arr = sitk.GetArrayFromImage(sitk.Extract(image, size, [0, 0, z]))
+    l2d = sitk.GetArrayFromImage(sitk.Extract(lung, size, [0, 0, z]))
+    i2d = sitk.GetArrayFromImage(sitk.Extract(inf, size, [0, 0, z]))
+
+    # numpy-rasterized boundaries; matplotlib contours only if imageio is missing
+    if IMAGEIO:
+        save_overlay_fast(arr, l2d, i2d, out_png)
+        return
+
+    if not MPL:
+        raise RuntimeError("save_overlay needs imageio or matplotlib.")
+    fig, ax = _overlay_axes()
+    ax.imshow(arr, cmap="gray")
     # cyan = lung, magenta = infection
-    plt.contour(l2d == 1, linewidths=0.7, colors="cyan")
-    plt.contour(i2d == 1, linewidths=0.7, colors="magenta")
-    plt.axis("off")
-    plt.savefig(out_png, bbox_inches="tight", dpi=200)
-    plt.close()
+    ax.contour(l2d == 1, linewidths=0.7, colors="cyan")
+    ax.contour(i2d == 1, linewidths=0.7, colors="magenta")
+    ax.axis("off")
+    fig.savefig(out_png, bbox_inches="tight", dpi=200)
 
 
 def clean_infection_mask_size_only(infection_mask, min_cc_vox=30):
@@ -64,19 +93,9 @@ def clean_infection_mask_size_only(infection_mask, min_cc_vox=30):
     Simple CC cleanup: drop tiny blobs, keep everything else.
     This stays in the 'fixed threshold + morphology' family.
     """
-    cc = sitk.ConnectedComponent(infection_mask)
-    stats = sitk.LabelShapeStatisticsImageFilter()
-    stats.Execute(cc)
-
-    cleaned = sitk.Image(infection_mask.GetSize(), sitk.sitkUInt8)
-    cleaned.CopyInformation(infection_mask)
-
-    for l in stats.GetLabels():
-        if stats.GetNumberOfPixels(l) < min_cc_vox:
-            continue
-        cleaned = cleaned | sitk.BinaryThreshold(cc, l, l, 1, 0)
-
-    return sitk.Cast(cleaned > 0, infection_mask.GetPixelID())
+    # Numba keep-by-size when available, RelabelComponent otherwise
+    cleaned = remove_small_components(infection_mask, min_cc_vox)
+    return sitk.Cast(cleaned, infection_mask.GetPixelID())
 
 
 # ---------- core ----------
@@ -86,64 +105,73 @@ def run_once(dicom_dir: str, out_dir: str):
 
     # 1) Read & preprocess
     img_raw = read_dicom_series(dicom_dir)          # HU
-    img_clip = sitk.Clamp(img_raw, sitk.sitkFloat32, -1000, 400)
-    img_r = resample_isotropic(img_clip, (1.25, 1.25, 1.25))
-
-    # Normalized image (z-score after clipping); still just a global transform
-    img_n = clip_and_norm(img_r, -1000, 400, zscore=True)
+    # clip -> 1.25 mm isotropic -> normalized (z-score after clipping); still just a global transform
+    img_r, img_n = preprocess_fused(img_raw, -1000, 400, (1.25, 1.25, 1.25), zscore=True)
+    del img_raw  # full-resolution volume isn't needed past this point
 
     # 2) Manual / auto seeds → region growing lungs
-    from covid_ct.segmentation.auto_seed import auto_lung_seeds, manual_lung_seeds
+    from covid_ct.segmentation.auto_seed import auto_lung_seeds_fast, manual_lung_seeds
 
     FORCE_MANUAL_SEEDS = True  # set False if you want auto seeding
 
     if FORCE_MANUAL_SEEDS:
         seeds = manual_lung_seeds(img_r, num_points=2, z=None)
     else:
-        seeds = auto_lung_seeds(img_r, air_hu=-700)
+        seeds = auto_lung_seeds_fast(img_r, air_hu=-700)
     print("Seeds:", seeds)
 
-    lung = lung_mask_region_growing(img_r, seeds, lower=-950, upper=-500)
+    # the lung mask and the two thresholds below are independent until the &;
+    # region growing runs on a worker (SimpleITK releases the GIL) while the
+    # thresholds are done in numpy on views of img_r / img_n
+    with ThreadPoolExecutor(1) as ex:
+        f_lung = ex.submit(lung_mask_region_growing, img_r, seeds, lower=-950, upper=-500)
 
-    # 3) Dilated lung support (include pleural-based consolidation, but don't leave chest)
-    lung_support = sitk.BinaryDilate(lung, [3, 3, 3])
-
-    # ------------------------------------------------------------------
-    # 4) Fixed-threshold infection detection inside lung_support
-    #    No adaptive delta; just learned constants from your experiments.
-    # ------------------------------------------------------------------
-
-    # a) HU band: denser than normal air-filled lung, but not bone
-    infection_hu = sitk.BinaryThreshold(
-        img_r,
-        lowerThreshold=-750,   # suspicious if denser than this
-        upperThreshold=250     # cut off bone / very dense stuff
-    )
+        # ------------------------------------------------------------------
+        # 4) Fixed-threshold infection detection inside lung_support
+        #    No adaptive delta; just learned constants from your experiments.
+        # ------------------------------------------------------------------
+        arr_r = sitk.GetArrayViewFromImage(img_r)
+        arr_n = sitk.GetArrayViewFromImage(img_n)
 
-    # b) Global normalized threshold: "brighter than average lung"
-    #    This is still a fixed value, not local/adaptive per voxel.
-    infection_norm = sitk.BinaryThreshold(
-        img_n,
-        lowerThreshold=0.3,    # tweak 0.2–0.5 if needed
-        upperThreshold=10.0
-    )
+        # a) HU band: denser than normal air-filled lung, but not bone
+        #    (suspicious if denser than -750; cut off bone / very dense stuff above 250)
+        init_np = (arr_r >= -750) & (arr_r <= 250)
+
+        # b) Global normalized threshold: "brighter than average lung"
+        #    This is still a fixed value, not local/adaptive per voxel.
+        init_np &= (arr_n >= 0.3) & (arr_n <= 10.0)   # tweak 0.3 in 0.2–0.5 if needed
+
+        lung = f_lung.result()
+
+    # 3) Dilated lung support (include pleural-based consolidation, but don't leave chest)
+    #    7x7x7 box (radius 3); maximum_filter runs it as separable 1-D passes
+    lung_support = ndimage.maximum_filter(sitk.GetArrayViewFromImage(lung), size=7, mode="constant", cval=0)
 
-    # c) Restrict to lung_support
-    infection_init = infection_hu & infection_norm & lung_support
+    # c) Restrict to lung_support; back to SimpleITK once, for the morphology below
+    init_np &= lung_support > 0
+    infection_init = sitk.GetImageFromArray(init_np.astype(np.uint8))
+    infection_init.CopyInformation(img_r)
+    # drop the numpy intermediates and img_n (no longer needed) before morphology
+    del init_np, lung_support, arr_r, arr_n, img_n
 
     # save for debugging / slides
-    write_nifti(infection_init, out / "mask_infection_init.nii.gz")
+    write_nifti_fast(infection_init, out / "mask_infection_init.nii.gz")
 
     # 5) Morphology + CC cleanup
-    infection = sitk.BinaryMorphologicalClosing(infection_init, [1, 1, 1])
+    infection = binary_closing_3d(infection_init, 1, kernel="box")
+    del infection_init
     infection = sitk.BinaryFillhole(infection, True, 2)
     infection = clean_infection_mask_size_only(infection, min_cc_vox=30)
 
     # 6) Save outputs
-    write_nifti(img_r, out / "image_resampled.nii.gz")
-    write_nifti(lung, out / "mask_lung.nii.gz")
-    write_nifti(infection, out / "mask_infection.nii.gz")
-    save_overlay(img_r, lung, infection, out / "qc_overlay.png")
+    with ThreadPoolExecutor(3) as ex:
+        writes = [
+            ex.submit(write_nifti_fast, img_r, out / "image_resampled.nii.gz"),
+            ex.submit(write_nifti_fast, lung, out / "mask_lung.nii.gz"),
+            ex.submit(write_nifti_fast, infection, out / "mask_infection.nii.gz"),
+        ]
+        save_overlay(img_r, lung, infection, out / "qc_overlay.png")
+        for f in writes: f.result()   # re-raise write errors here
 
     print(f"Saved to: {out}")
     return str(out)
@@ -166,17 +194,13 @@ def main():
         out = run_once(dicom_dir, out_dir)
 
         try:
-            root = tk.Tk(); root.withdraw()
-            messagebox.showinfo("Done", f"Outputs saved to:\n{out}")
-            root.destroy()
+            messagebox.showinfo("Done", f"Outputs saved to:\n{out}", parent=tk_root())
         except Exception:
             pass
 
     except Exception as e:
         try:
-            root = tk.Tk(); root.withdraw()
-            messagebox.showerror("Error", str(e))
-            root.destroy()
+            messagebox.showerror("Error", str(e), parent=tk_root())
         except Exception:
             pass
         print("Error:", e)
@@ -0,0 +1,5 @@
+# tests/conftest.py
+import os, sys
+
+# make "import covid_ct" work without installing the package (same trick as scripts/)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -0,0 +1,28 @@
+# tests/test_morphology.py
+import pytest
+
+np = pytest.importorskip("numpy")
+sitk = pytest.importorskip("SimpleITK")
+
+from covid_ct.segmentation.morphology import binary_closing_3d
+
+
+@pytest.mark.parametrize("r", [1, 2, 3])
+def test_box_closing_matches_sitk(r):
+    rng = np.random.default_rng(r)
+    arr = (rng.random((40, 50, 45)) > 0.8).astype(np.uint8)
+    # objects touching every face of the volume
+    arr[0, 10:20, 10:20] = 1; arr[-1, 5:9, 30:40] = 1
+    arr[:, 0, 3:7] = 1; arr[12:30, -1, :] = 1
+    arr[5:15, 20:30, 0] = 1; arr[20:22, :, -1] = 1
+    mask = sitk.GetImageFromArray(arr)
+    mask.SetSpacing((0.7, 0.8, 1.5))
+    mask.SetOrigin((-10.0, 4.0, 2.5))
+
+    got = binary_closing_3d(mask, r, kernel="box")
+    ref = sitk.BinaryMorphologicalClosing(mask, [r] * 3, sitk.sitkBox)
+
+    assert got.GetSize() == mask.GetSize()
+    assert got.GetOrigin() == mask.GetOrigin()
+    assert got.GetSpacing() == mask.GetSpacing()
+    np.testing.assert_array_equal(sitk.GetArrayFromImage(got), sitk.GetArrayFromImage(ref))
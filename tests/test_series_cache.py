@@ -0,0 +1,31 @@
+# tests/test_series_cache.py
+import os
+
+import pytest
+
+pytest.importorskip("SimpleITK")
+pytest.importorskip("orjson")
+
+from covid_ct.io import _series_cache
+
+
+def test_index_cache_round_trip_many_files(tmp_path, monkeypatch):
+    # > 10 files: a summed mtime_ns signature used to overflow orjson's 64-bit ints
+    dicom_dir = tmp_path / "series"
+    dicom_dir.mkdir()
+    for i in range(17):
+        (dicom_dir / f"IM{i:04d}.dcm").write_bytes(b"\0" * 128 + b"DICM")
+
+    monkeypatch.setattr(_series_cache, "CACHE_DIR", tmp_path / "cache")
+    calls = []
+    series = {"1.2.3": {"files": ["a", "b"], "modality": "CT", "desc": "chest"}}
+    def fake_scan(d):
+        calls.append(d)
+        return series
+    monkeypatch.setattr(_series_cache, "_scan", fake_scan)
+
+    assert _series_cache.get_series_index(str(dicom_dir)) == series
+    assert _series_cache._cache_file(os.path.abspath(str(dicom_dir))).exists()
+    # second call is served from the JSON cache, no rescan
+    assert _series_cache.get_series_index(str(dicom_dir)) == series
+    assert len(calls) == 1